@@ -45,9 +45,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django_rq',
     'sales_hub.apps.SalesHubConfig',
     'whatsapp_webhook',
     'public_site',
+    'users',
 ]
 
 MIDDLEWARE = [
@@ -94,6 +96,59 @@ DATABASES = {
 }
 
 
+# Cache
+# Redis is used when REDIS_URL is set; otherwise Django's per-process local memory cache.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+
+# Background jobs (django-rq)
+# Without REDIS_URL, bluerock.tasks.run_in_background runs jobs inline.
+# Start a worker with: python manage.py rqworker default
+
+RQ_QUEUES = {
+    'default': {
+        'URL': REDIS_URL or 'redis://localhost:6379/0',
+        'DEFAULT_TIMEOUT': 300,
+    },
+}
+
+
+# Logging
+# The whatsapp_webhook package (views, tasks and handlers, including on the
+# rq worker) logs to the console at INFO.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'timestamped': {
+            'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'timestamped',
+        },
+    },
+    'loggers': {
+        'whatsapp_webhook': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,37 @@
+"""
+Helpers for running work outside the request/response cycle.
+
+Jobs go to the django-rq ``default`` queue when Redis is configured
+(``REDIS_URL``); otherwise they run inline so development setups need
+no worker.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from redis.exceptions import RedisError
+import django_rq
+
+logger = logging.getLogger(__name__)
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Queue ``func(*args, **kwargs)`` once the current transaction commits.
+
+    Without Redis the call runs immediately, inside the caller's transaction.
+    If Redis is configured but cannot be reached, it runs inline after the
+    commit instead of being lost.
+    """
+    if not settings.REDIS_URL:
+        func(*args, **kwargs)
+        return
+
+    def enqueue():
+        try:
+            django_rq.enqueue(func, *args, **kwargs)
+        except RedisError:
+            logger.exception("Could not queue %s, running it inline", func.__name__)
+            func(*args, **kwargs)
+
+    transaction.on_commit(enqueue)
@@ -1,4 +1,6 @@
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Count, Q
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -51,6 +53,9 @@ class ServiceRequest(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    STATS_CACHE_KEY = 'sr:stats'
+    STATS_CACHE_TIMEOUT = 60
+    
     # Customer Information
     phone_number = models.CharField(max_length=20, help_text="Customer phone number")
     
@@ -131,7 +136,33 @@ class ServiceRequest(models.Model):
         # Set completed_at when status changes to completed
         if self.status == 'completed' and not self.completed_at:
             self.completed_at = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = [*kwargs['update_fields'], 'completed_at']
         super().save(*args, **kwargs)
+        cache.delete(self.STATS_CACHE_KEY)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        cache.delete(self.STATS_CACHE_KEY)
+        return result
+    
+    @classmethod
+    def get_stats(cls):
+        """
+        Return total, pending and high-priority request counts.
+        
+        The counts are shared by every agent, so they are cached for
+        STATS_CACHE_TIMEOUT seconds and dropped whenever a request is saved.
+        """
+        return cache.get_or_set(cls.STATS_CACHE_KEY, cls._compute_stats, cls.STATS_CACHE_TIMEOUT)
+    
+    @classmethod
+    def _compute_stats(cls):
+        return cls.objects.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            high_priority=Count('id', filter=Q(status='pending', lead_score__gte=70, timeline='immediate')),
+        )
     
     @property
     def is_high_priority(self):
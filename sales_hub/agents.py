@@ -0,0 +1,24 @@
+from .models import Agent
+
+
+def get_agent_or_none(user):
+    """Return the agent profile for a user, creating one for superusers if needed."""
+    agent = Agent.objects.filter(user=user).select_related('user').first()
+    if agent is None and user.is_superuser:
+        agent, _ = Agent.objects.get_or_create(
+            user=user,
+            defaults={'phone': getattr(user, 'phone', '')}
+        )
+    return agent
+
+
+def get_agent(request):
+    """Return the agent for ``request.user``, looked up at most once per request."""
+    if not hasattr(request, '_cached_agent'):
+        user = request.user
+        agent = get_agent_or_none(user) if user.is_authenticated else None
+        if agent is not None:
+            # base.html reads request.user.agent_profile; reuse this lookup
+            user.agent_profile = agent
+        request._cached_agent = agent
+    return request._cached_agent
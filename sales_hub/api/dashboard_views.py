@@ -204,7 +204,7 @@ def service_requests_list(request):
     limit = int(request.GET.get('limit', 20))
     
     # Base queryset
-    queryset = ServiceRequest.objects.all()
+    queryset = ServiceRequest.objects.select_related('assigned_to', 'assigned_to__user')
     
     # Apply filters
     if status_filter:
@@ -0,0 +1,18 @@
+from django.core.cache import cache
+
+DASHBOARD_CACHE_TIMEOUT = 30
+
+
+def dashboard_cache_key(agent_id, version):
+    return f'dash:{agent_id}:{version}'
+
+
+def get_dashboard_summary(agent_id, version, build):
+    """
+    Return the cached dashboard summary for an agent, building it with ``build()`` on a miss.
+
+    ``version`` is the dashboard fingerprint (see ``views.dashboard_version``), so
+    any change to the underlying records selects a new entry; no invalidation is
+    needed and stale entries simply expire.
+    """
+    return cache.get_or_set(dashboard_cache_key(agent_id, version), build, DASHBOARD_CACHE_TIMEOUT)
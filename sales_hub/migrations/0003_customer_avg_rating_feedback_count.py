@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-16 01:08
+
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Customer = apps.get_model('sales_hub', 'Customer')
+    Feedback = apps.get_model('sales_hub', 'Feedback')
+    stats = Feedback.objects.values('customer_id').annotate(avg=Avg('rating'), count=Count('id'))
+    for row in stats:
+        Customer.objects.filter(pk=row['customer_id']).update(
+            avg_rating=row['avg'] or 0,
+            feedback_count=row['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_hub', '0002_product_purchase_quickservicerequest_supportrequest_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='avg_rating',
+            field=models.FloatField(default=0, editable=False, help_text='Average feedback rating, maintained by sales_hub.signals'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='feedback_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_hub', '0003_customer_avg_rating_feedback_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['assigned_to', 'is_active'], name='sales_hub_l_assigne_f45228_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Trigram indexes backing the customer list search on PostgreSQL.
+
+from django.db import migrations
+
+# customer_list filters with icontains, which PostgreSQL compiles to
+# UPPER("column"::text) LIKE UPPER(%s); the index expressions must match.
+SEARCH_COLUMNS = ('name', 'phone', 'email')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS sales_hub_customer_{column}_trgm '
+            f'ON sales_hub_customer USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS sales_hub_customer_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_hub', '0004_lead_assigned_to_is_active_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
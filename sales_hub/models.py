@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Avg, Count, F
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -24,6 +25,34 @@ class Agent(models.Model):
         return f"{self.user.get_full_name() or self.user.username}"
 
 
+class CustomerManager(models.Manager):
+    """Manager with the customer querysets used by the sales hub views."""
+
+    def active(self):
+        return self.filter(is_active=True)
+
+    def for_agent(self, agent):
+        """Active customers assigned to the given agent."""
+        return self.filter(is_active=True, assigned_agent=agent)
+
+    def update_rating_stats(self, customer_id):
+        """Recompute avg_rating and feedback_count from a customer's feedback."""
+        stats = Feedback.objects.filter(customer_id=customer_id).aggregate(
+            avg=Avg('rating'), count=Count('id')
+        )
+        self.filter(pk=customer_id).update(
+            avg_rating=stats['avg'] or 0,
+            feedback_count=stats['count'],
+        )
+
+    def add_rating(self, customer_id, rating):
+        """Fold one new rating into a customer's running average."""
+        self.filter(pk=customer_id).update(
+            avg_rating=(F('avg_rating') * F('feedback_count') + rating) / (F('feedback_count') + 1.0),
+            feedback_count=F('feedback_count') + 1,
+        )
+
+
 class Customer(models.Model):
     """Customer model to store customer information and visit details."""
     VISIT_REASON_CHOICES = [
@@ -51,9 +80,17 @@ class Customer(models.Model):
         related_name='customers'
     )
     is_active = models.BooleanField(default=True)
+    avg_rating = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="Average feedback rating, maintained by sales_hub.signals"
+    )
+    feedback_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CustomerManager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -131,6 +168,9 @@ class Lead(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Lead'
         verbose_name_plural = 'Leads'
+        indexes = [
+            models.Index(fields=['assigned_to', 'is_active']),
+        ]
 
     def __str__(self):
         return f"Lead: {self.customer.name} - {self.get_status_display()}"
@@ -177,6 +217,8 @@ class Feedback(models.Model):
         if not self.agent and hasattr(self.customer, 'assigned_agent'):
             self.agent = self.customer.assigned_agent
         super().save(*args, **kwargs)
+        # avg_rating/feedback_count on the customer are kept in step by the
+        # receivers in sales_hub.signals, which also run for queryset deletes.
 
 
 class Interaction(models.Model):
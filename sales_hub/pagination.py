@@ -0,0 +1,32 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator that caches the total object count between page views.
+
+    Every page of a paginated list needs the total count, which is a full
+    COUNT(*) over the filtered queryset. The count is cached for
+    ``count_cache_timeout`` seconds under a key derived from the queryset's
+    SQL, so each filter combination gets its own entry.
+    """
+    count_cache_timeout = 30
+
+    def get_count_cache_key(self):
+        sql = str(self.object_list.query)
+        return f"paginator:{hashlib.md5(sql.encode()).hexdigest()}"
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        return cache.get_or_set(
+            self.get_count_cache_key(), self._uncached_count, self.count_cache_timeout
+        )
+
+    def _uncached_count(self):
+        return super().count
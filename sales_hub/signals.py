@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Customer, Feedback
+
+
+@receiver(post_init, sender=Feedback)
+def remember_feedback_customer(sender, instance, **kwargs):
+    # Lets post_save tell when a feedback was moved to another customer.
+    # Read from __dict__ so a deferred customer_id is not fetched here.
+    instance._loaded_customer_id = instance.__dict__.get('customer_id')
+
+
+@receiver(post_save, sender=Feedback)
+def feedback_saved(sender, instance, created, raw, **kwargs):
+    """Keep the customer's denormalized avg_rating and feedback_count in step."""
+    if raw:
+        return
+    if created:
+        # New feedback folds into the running average
+        Customer.objects.add_rating(instance.customer_id, instance.rating)
+    else:
+        # Edits recompute from scratch, for the previous customer too if moved
+        Customer.objects.update_rating_stats(instance.customer_id)
+        previous_customer_id = instance._loaded_customer_id
+        if previous_customer_id not in (None, instance.customer_id):
+            Customer.objects.update_rating_stats(previous_customer_id)
+    instance._loaded_customer_id = instance.customer_id
+
+
+@receiver(post_delete, sender=Feedback)
+def feedback_deleted(sender, instance, **kwargs):
+    # Also sent for each row of QuerySet.delete(), e.g. the admin bulk action
+    Customer.objects.update_rating_stats(instance.customer_id)
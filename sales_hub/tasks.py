@@ -0,0 +1,12 @@
+from .models import Interaction
+
+
+def create_interaction_audit(customer_id, agent_id, notes):
+    """Record the interaction that audits a lead update."""
+    Interaction.objects.create(
+        customer_id=customer_id,
+        agent_id=agent_id,
+        action_type='meeting',
+        notes=notes,
+        is_completed=True
+    )
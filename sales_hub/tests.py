@@ -1,3 +1,126 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from .agents import get_agent
+from .models import Agent, Customer, Feedback, Lead
+
+User = get_user_model()
+
+
+class DashboardEtagTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('agent@example.com', 'agent@example.com', 'pw')
+        self.agent = Agent.objects.create(user=self.user)
+        self.customer = Customer.objects.create(name='Cust', phone='0712', assigned_agent=self.agent)
+        self.client.force_login(self.user)
+        self.url = reverse('sales_hub:dashboard')
+
+    def get_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_dashboard_is_not_modified(self):
+        etag = self.get_etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_customer_changes_etag(self):
+        etag = self.get_etag()
+        Customer.objects.create(name='New', phone='0799', assigned_agent=self.agent)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['request'].user.agent_profile.customers.count(), 2)
+
+    def test_user_name_changes_etag(self):
+        etag = self.get_etag()
+        User.objects.filter(pk=self.user.pk).update(first_name='Renamed')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_inactive_lead_changes_etag(self):
+        # The sidebar counts every assigned lead, not only active ones
+        etag = self.get_etag()
+        Lead.objects.create(customer=self.customer, assigned_to=self.agent, is_active=False)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class DashboardSummaryCacheTests(TestCase):
+    def setUp(self):
+        self.user_a = User.objects.create_user('a@example.com', 'a@example.com', 'pw')
+        self.agent_a = Agent.objects.create(user=self.user_a)
+        self.agent_b = Agent.objects.create(
+            user=User.objects.create_user('b@example.com', 'b@example.com', 'pw')
+        )
+        customer = Customer.objects.create(name='Cust', phone='0712', assigned_agent=self.agent_a)
+        self.lead = Lead.objects.create(customer=customer, assigned_to=self.agent_a)
+        self.client.force_login(self.user_a)
+        self.url = reverse('sales_hub:dashboard')
+
+    def test_reassigned_lead_leaves_previous_agents_dashboard(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['lead_stats']['total'], 1)
+        etag = response['ETag']
+
+        self.lead.assigned_to = self.agent_b
+        self.lead.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['lead_stats']['total'], 0)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # The new ETag revalidates against the rebuilt summary
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class CustomerRatingStatsTests(TestCase):
+    def setUp(self):
+        self.first = Customer.objects.create(name='First', phone='0711')
+        self.second = Customer.objects.create(name='Second', phone='0722')
+
+    def assertStats(self, customer, avg_rating, feedback_count):
+        customer.refresh_from_db()
+        self.assertEqual(customer.avg_rating, avg_rating)
+        self.assertEqual(customer.feedback_count, feedback_count)
+
+    def test_create(self):
+        Feedback.objects.create(customer=self.first, rating=4)
+        Feedback.objects.create(customer=self.first, rating=2)
+        self.assertStats(self.first, 3.0, 2)
+
+    def test_edit(self):
+        feedback = Feedback.objects.create(customer=self.first, rating=4)
+        feedback.rating = 5
+        feedback.save()
+        self.assertStats(self.first, 5.0, 1)
+
+    def test_move_to_another_customer(self):
+        feedback = Feedback.objects.create(customer=self.first, rating=4)
+        feedback = Feedback.objects.get(pk=feedback.pk)
+        feedback.customer = self.second
+        feedback.save()
+        self.assertStats(self.first, 0, 0)
+        self.assertStats(self.second, 4.0, 1)
+
+    def test_bulk_delete(self):
+        kept = Feedback.objects.create(customer=self.first, rating=5)
+        Feedback.objects.create(customer=self.first, rating=1)
+        Feedback.objects.create(customer=self.first, rating=3)
+        Feedback.objects.exclude(pk=kept.pk).delete()
+        self.assertStats(self.first, 5.0, 1)
+
+
+class GetAgentTests(TestCase):
+    def test_agent_profile_reuses_lookup(self):
+        user = User.objects.create_user('agent@example.com', 'agent@example.com', 'pw')
+        agent = Agent.objects.create(user=user)
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_agent(request), agent)
+            self.assertEqual(get_agent(request), agent)
+            self.assertEqual(request.user.agent_profile, agent)
@@ -1,69 +1,189 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.http import JsonResponse
-from django.db.models import Count, Q, Avg
+from django.template.response import TemplateResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.db.models import Count, Func, Q, Subquery
 from django.utils import timezone
 from datetime import timedelta
+from functools import lru_cache, wraps
 import base64
+import hashlib
 import io
 
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from .models import Agent, Customer, Lead, Feedback, Interaction
 from .quick_services import QuickServiceRequest
 from .forms import LeadUpdateForm, FeedbackForm, InteractionForm
+from .pagination import CachedCountPaginator
+from .caching import get_dashboard_summary
+from .agents import get_agent
+from .tasks import create_interaction_audit
+from bluerock.tasks import run_in_background
 from public_site.models import ServiceRequest
-import qrcode
 
 
-def get_agent_or_none(user):
-    """Return the agent profile for a user, creating one for superusers if needed."""
-    if hasattr(user, 'agent_profile'):
-        return user.agent_profile
-    if user.is_superuser:
-        agent, _ = Agent.objects.get_or_create(
-            user=user,
-            defaults={'phone': getattr(user, 'phone', '')}
+PUBLIC_SITE_URL = 'https://www.yasbluerock.shop/'
+
+# Maximum number of customers and leads handed to the dashboard template
+DASHBOARD_LIST_LIMIT = 50
+
+SERVICE_REQUEST_STATUSES = frozenset(key for key, _ in ServiceRequest.STATUS_CHOICES)
+
+
+@lru_cache(maxsize=None)
+def public_site_qr_base64():
+    """Base64 PNG of the public site QR code, rendered once per process."""
+    # qrcode pulls in PIL on import; only pay for it when the code is first built.
+    import qrcode
+
+    qr = qrcode.make(PUBLIC_SITE_URL)
+    buffer = io.BytesIO()
+    qr.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def status_counts(queryset, statuses, total_key='total'):
+    """
+    Count the rows of ``queryset`` per status with a single GROUP BY query.
+
+    Every status in ``statuses`` is present in the result (0 when it has no
+    rows), and ``total_key`` holds the count across all statuses.
+    """
+    counts = dict.fromkeys(statuses, 0)
+    rows = queryset.order_by().values('status').annotate(n=Count('id'))
+    for row in rows:
+        counts[row['status']] = row['n']
+    counts[total_key] = sum(row['n'] for row in rows)
+    return {status: counts[status] for status in (total_key, *statuses)}
+
+
+def _require_agent_or_super(request, owner_agent_id):
+    """Return True if the user is a superuser or the agent with ``owner_agent_id``."""
+    if request.user.is_superuser:
+        return True
+    agent = get_agent(request)
+    return agent is not None and agent.id == owner_agent_id
+
+
+def require_customer_access(view):
+    """
+    Load the active customer for ``customer_id`` and check the user may access it.
+
+    The customer is passed to the wrapped view in place of ``customer_id``.
+    """
+    @wraps(view)
+    def _wrapped_view(request, customer_id, *args, **kwargs):
+        customer = get_object_or_404(
+            Customer.objects.active().select_related('assigned_agent'),
+            pk=customer_id,
         )
-        return agent
-    return None
+        if not _require_agent_or_super(request, customer.assigned_agent_id):
+            messages.error(request, "You don't have permission to access this customer.")
+            return redirect('sales_hub:dashboard')
+        return view(request, customer, *args, **kwargs)
+    return _wrapped_view
 
 
-@login_required
-def dashboard(request):
-    """Agent dashboard showing assigned customers, leads, and recent activity."""
-    agent = get_agent_or_none(request.user)
+def _count_and_latest(queryset, field):
+    """
+    Scalar subqueries for the row count and latest ``field`` of ``queryset``.
+
+    COUNT/MAX are written as plain functions so no GROUP BY is added and all
+    of them can be selected together in a single query.
+    """
+    queryset = queryset.order_by()
+    return {
+        'n': Subquery(queryset.values(n=Func('id', function='COUNT'))),
+        'latest': Subquery(queryset.values(latest=Func(field, function='MAX'))),
+    }
+
+
+def dashboard_version(request, agent):
+    """
+    Fingerprint of every record the dashboard (including the base.html sidebar)
+    renders for ``agent``, computed with one query and memoized on the request.
+    """
+    if not hasattr(request, '_dashboard_version'):
+        expressions = {}
+        for name, queryset, field in (
+            ('customers', Customer.objects.filter(assigned_agent=agent), 'updated_at'),
+            ('leads', Lead.objects.filter(assigned_to=agent), 'updated_at'),
+            ('interactions', Interaction.objects.filter(agent=agent), 'updated_at'),
+            ('feedback', Feedback.objects.filter(customer__assigned_agent=agent), 'updated_at'),
+            ('quick_services', QuickServiceRequest.objects.filter(customer__assigned_agent=agent), 'updated_at'),
+        ):
+            for key, expression in _count_and_latest(queryset, field).items():
+                expressions[f'{name}_{key}'] = expression
+        state = Agent.objects.filter(pk=agent.pk).values(**expressions).get()
+        # base.html also shows the user's name and email in the header
+        user = request.user
+        parts = [
+            agent.id, user.username, user.get_full_name(), user.email,
+            *(state[name] for name in sorted(state)),
+        ]
+        request._dashboard_version = hashlib.md5(repr(parts).encode()).hexdigest()
+    return request._dashboard_version
+
+
+def dashboard_etag(request):
+    """
+    ETag for the dashboard, derived from the latest change to the records it shows.
+
+    Returns None (no conditional handling) while flash messages are pending so
+    they are never swallowed by a 304.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    agent = get_agent(request)
     if not agent:
-        return render(request, 'sales_hub/agent_profile_required.html')
-    
-    # Get assigned customers
-    customers = agent.customers.filter(is_active=True).select_related('lead')
-    
-    # Get leads assigned to the agent
-    leads = Lead.objects.filter(
-        assigned_to=agent,
-        is_active=True
-    ).select_related('customer', 'assigned_to')
-    
+        return None
+    return dashboard_version(request, agent)
+
+
+def _build_dashboard_summary(agent, customers, leads):
+    """
+    Compute the dashboard stats and recent activity for an agent.
+
+    Recent records are flattened to dicts so the summary can be cached.
+    """
     # Get recent feedback for agent's customers
-    recent_feedback = Feedback.objects.filter(
-        customer__in=customers
-    ).order_by('-created_at')[:5]
+    customer_ids = list(customers.values_list('id', flat=True))
+    recent_feedback = [
+        {
+            'id': feedback.id,
+            'customer_name': feedback.customer.name,
+            'rating': feedback.rating,
+            'comment': feedback.comment,
+            'created_at': feedback.created_at,
+        }
+        for feedback in Feedback.objects.filter(
+            customer_id__in=customer_ids
+        ).select_related('customer').order_by('-created_at')[:5]
+    ]
     
     # Get recent interactions
-    recent_interactions = Interaction.objects.filter(
-        agent=agent
-    ).order_by('-created_at')[:5]
+    recent_interactions = [
+        {
+            'id': interaction.id,
+            'customer_name': interaction.customer.name,
+            'action_type': interaction.action_type,
+            'action_type_display': interaction.get_action_type_display(),
+            'notes': interaction.notes,
+            'created_at': interaction.created_at,
+        }
+        for interaction in Interaction.objects.filter(
+            agent=agent
+        ).select_related('customer').order_by('-created_at')[:5]
+    ]
     
     # Get lead statistics
-    lead_stats = {
-        'total': leads.count(),
-        'new': leads.filter(status='new').count(),
-        'contacted': leads.filter(status='contacted').count(),
-        'qualified': leads.filter(status='qualified').count(),
-        'closed_won': leads.filter(status='closed_won').count(),
-        'closed_lost': leads.filter(status='closed_lost').count(),
-    }
+    lead_stats = status_counts(
+        leads, ('new', 'contacted', 'qualified', 'closed_won', 'closed_lost')
+    )
     
     # Calculate conversion rate (won / (won + lost))
     total_closed = lead_stats['closed_won'] + lead_stats['closed_lost']
@@ -74,49 +194,85 @@ def dashboard(request):
     # Get Quick Services statistics
     quick_services = QuickServiceRequest.objects.filter(customer__assigned_agent=agent)
     
-    # Get recent Quick Services requests (last 5)
-    recent_quick_services = quick_services.order_by('-created_at')[:5]
-    
     # Count by status
-    quick_services_stats = {
-        'total_requests': quick_services.count(),
-        'pending': quick_services.filter(status='pending').count(),
-        'in_progress': quick_services.filter(status='in_progress').count(),
-        'completed': quick_services.filter(status='completed').count(),
-        'cancelled': quick_services.filter(status='cancelled').count(),
-        'recent_requests': recent_quick_services,
-    }
+    quick_services_stats = status_counts(
+        quick_services,
+        ('pending', 'in_progress', 'completed', 'cancelled'),
+        total_key='total_requests',
+    )
     
-    # Generate QR code for public self-service portal
-    qr = qrcode.make('https://www.yasbluerock.shop/')
-    buffer = io.BytesIO()
-    qr.save(buffer, format='PNG')
-    yas_qr_base64 = base64.b64encode(buffer.getvalue()).decode('ascii')
-
-    context = {
-        'agent': agent,
-        'customers': customers,
-        'leads': leads,
+    # Get recent Quick Services requests (last 5)
+    quick_services_stats['recent_requests'] = [
+        {
+            'id': service.id,
+            'customer_name': service.customer.name,
+            'service_type': service.service_type,
+            'service_type_display': service.get_service_type_display(),
+            'status': service.status,
+            'status_display': service.get_status_display(),
+            'created_at': service.created_at,
+        }
+        for service in quick_services.select_related('customer').order_by('-created_at')[:5]
+    ]
+    
+    return {
         'recent_interactions': recent_interactions,
         'recent_feedback': recent_feedback,
         'lead_stats': lead_stats,
         'quick_services_stats': quick_services_stats,
-        'yas_qr_base64': yas_qr_base64,
+    }
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=dashboard_etag)
+def dashboard(request):
+    """Agent dashboard showing assigned customers, leads, and recent activity."""
+    agent = get_agent(request)
+    if not agent:
+        return render(request, 'sales_hub/agent_profile_required.html')
+    
+    # Get assigned customers
+    customers = Customer.objects.for_agent(agent).select_related('lead')
+    
+    # Get leads assigned to the agent
+    leads = Lead.objects.filter(
+        assigned_to=agent,
+        is_active=True
+    ).select_related('customer', 'assigned_to', 'assigned_to__user')
+    
+    summary = get_dashboard_summary(
+        agent.id,
+        dashboard_version(request, agent),
+        lambda: _build_dashboard_summary(agent, customers, leads),
+    )
+    
+    context = {
+        'agent': agent,
+        'customers': customers[:DASHBOARD_LIST_LIMIT],
+        'leads': leads[:DASHBOARD_LIST_LIMIT],
+        **summary,
+        'yas_qr_base64': public_site_qr_base64(),
         'active_tab': 'dashboard',
     }
     
-    return render(request, 'sales_hub/dashboard.html', context)
+    return TemplateResponse(request, 'sales_hub/dashboard.html', context)
 
 
 @login_required
 def update_lead(request, lead_id):
     """Update lead status and notes."""
-    lead = get_object_or_404(Lead, id=lead_id, is_active=True)
+    lead = get_object_or_404(
+        Lead.objects.select_related('customer').only(
+            'id', 'status', 'lead_type', 'notes', 'expected_close_date', 'value',
+            'is_active', 'updated_at', 'customer_id', 'customer__name', 'assigned_to',
+        ),
+        id=lead_id,
+        is_active=True,
+    )
     
     # Check if the current user is the assigned agent or a superuser
-    if not (request.user.is_superuser or 
-            (hasattr(request.user, 'agent_profile') and 
-             request.user.agent_profile == lead.assigned_to)):
+    if not _require_agent_or_super(request, lead.assigned_to_id):
         messages.error(request, "You don't have permission to update this lead.")
         return redirect('sales_hub:dashboard')
     
@@ -129,16 +285,21 @@ def update_lead(request, lead_id):
             if 'status' in form.changed_data and form.cleaned_data['status'] in ['closed_won', 'closed_lost']:
                 updated_lead.expected_close_date = timezone.now().date()
             
-            updated_lead.save()
-            
-            # Create an interaction record
-            Interaction.objects.create(
-                customer=lead.customer,
-                agent=request.user.agent_profile,
-                interaction_type='meeting',
-                notes=f"Lead status updated to '{updated_lead.get_status_display()}'. {form.cleaned_data.get('notes', '')}",
-                is_completed=True
-            )
+            # Save the lead; the interaction record is written by a worker
+            # after commit, or in the same transaction when there is no queue.
+            with transaction.atomic():
+                # expected_close_date may be filled in by the view or LeadUpdateForm.clean()
+                # without showing up in changed_data, so it is always written.
+                updated_lead.save(
+                    update_fields=[*form.changed_data, 'expected_close_date', 'updated_at']
+                )
+                
+                run_in_background(
+                    create_interaction_audit,
+                    customer_id=lead.customer_id,
+                    agent_id=get_agent(request).id,
+                    notes=f"Lead status updated to '{updated_lead.get_status_display()}'. {form.cleaned_data.get('notes', '')}",
+                )
             
             messages.success(request, f"Lead for {lead.customer.name} has been updated successfully.")
             
@@ -169,25 +330,15 @@ def update_lead(request, lead_id):
 
 
 @login_required
-def customer_feedback(request, customer_id):
+@require_customer_access
+def customer_feedback(request, customer):
     """View and add feedback for a customer."""
-    customer = get_object_or_404(Customer, id=customer_id, is_active=True)
-    
-    # Check if the current user is the assigned agent or a superuser
-    if not (request.user.is_superuser or 
-            (hasattr(request.user, 'agent_profile') and 
-             request.user.agent_profile == customer.assigned_agent)):
-        messages.error(request, "You don't have permission to view this customer's feedback.")
-        return redirect('sales_hub:dashboard')
-    
-    feedback_list = Feedback.objects.filter(customer=customer).order_by('-created_at')
-    
     if request.method == 'POST':
         form = FeedbackForm(request.POST)
         if form.is_valid():
             feedback = form.save(commit=False)
             feedback.customer = customer
-            feedback.agent = request.user.agent_profile
+            feedback.agent = get_agent(request)
             feedback.save()
             
             messages.success(request, 'Feedback has been added successfully.')
@@ -195,14 +346,13 @@ def customer_feedback(request, customer_id):
     else:
         form = FeedbackForm()
     
-    # Calculate average rating
-    avg_rating = feedback_list.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
+    feedback_list = list(Feedback.objects.filter(customer=customer).order_by('-created_at'))
     
     context = {
         'customer': customer,
         'feedback_list': feedback_list,
         'form': form,
-        'avg_rating': round(avg_rating, 1),
+        'avg_rating': round(customer.avg_rating, 1),
         'active_tab': 'customers',
     }
     
@@ -210,23 +360,15 @@ def customer_feedback(request, customer_id):
 
 
 @login_required
-def add_interaction(request, customer_id):
+@require_customer_access
+def add_interaction(request, customer):
     """Add a new customer interaction."""
-    customer = get_object_or_404(Customer, id=customer_id, is_active=True)
-    
-    # Check if the current user is the assigned agent or a superuser
-    if not (request.user.is_superuser or 
-            (hasattr(request.user, 'agent_profile') and 
-             request.user.agent_profile == customer.assigned_agent)):
-        messages.error(request, "You don't have permission to add interactions for this customer.")
-        return redirect('sales_hub:dashboard')
-    
     if request.method == 'POST':
         form = InteractionForm(request.POST)
         if form.is_valid():
             interaction = form.save(commit=False)
             interaction.customer = customer
-            interaction.agent = request.user.agent_profile
+            interaction.agent = get_agent(request)
             interaction.save()
             
             messages.success(request, 'Interaction has been recorded successfully.')
@@ -260,53 +402,36 @@ def add_interaction(request, customer_id):
 
 
 @login_required
-def customer_detail(request, customer_id):
+@require_customer_access
+def customer_detail(request, customer):
     """View customer details, interactions, and related information."""
-    customer = get_object_or_404(Customer, id=customer_id, is_active=True)
-    
-    # Check if the current user is the assigned agent or a superuser
-    if not (request.user.is_superuser or 
-            (hasattr(request.user, 'agent_profile') and 
-             request.user.agent_profile == customer.assigned_agent)):
-        messages.error(request, "You don't have permission to view this customer's details.")
-        return redirect('sales_hub:dashboard')
-    
     # Get related data
     try:
         lead = customer.lead
     except Lead.DoesNotExist:
         lead = None
     
-    feedback_list = Feedback.objects.filter(customer=customer).order_by('-created_at')[:5]
+    feedback_list = list(Feedback.objects.filter(customer=customer).order_by('-created_at')[:5])
     interactions = Interaction.objects.filter(customer=customer).order_by('-created_at')[:10]
     
-    # Calculate average rating
-    avg_rating = Feedback.objects.filter(customer=customer).aggregate(
-        avg_rating=Avg('rating')
-    )['avg_rating'] or 0
-    
     # Get Quick Services history
     quick_services = QuickServiceRequest.objects.filter(
         customer=customer
     ).order_by('-created_at')
     
     # Count by status
-    quick_services_stats = {
-        'total': quick_services.count(),
-        'pending': quick_services.filter(status='pending').count(),
-        'in_progress': quick_services.filter(status='in_progress').count(),
-        'completed': quick_services.filter(status='completed').count(),
-        'cancelled': quick_services.filter(status='cancelled').count(),
-    }
+    quick_services_stats = status_counts(
+        quick_services, ('pending', 'in_progress', 'completed', 'cancelled')
+    )
     
     context = {
         'customer': customer,
         'lead': lead,
         'feedback_list': feedback_list,
         'interactions': interactions,
-        'quick_services': quick_services[:5],  # Show only the 5 most recent
+        'quick_services': list(quick_services[:5]),  # Show only the 5 most recent
         'quick_services_stats': quick_services_stats,
-        'avg_rating': round(avg_rating, 1),
+        'avg_rating': round(customer.avg_rating, 1),
         'active_tab': 'customers',
     }
     
@@ -326,17 +451,23 @@ def handler500(request):
 @login_required
 def customer_list(request):
     """List all customers with search and filtering options."""
-    try:
-        agent = request.user.agent_profile
-    except Agent.DoesNotExist:
+    agent = get_agent(request)
+    if agent is None:
         messages.error(request, "You need to have an agent profile to view customers.")
         return redirect('sales_hub:dashboard')
     
     # Get search query
     search_query = request.GET.get('q', '')
     
-    # Start with base queryset
-    customers = Customer.objects.filter(is_active=True)
+    # Superusers see every active customer, agents only their own.
+    # Customer.Meta.ordering already lists the most recent first.
+    if request.user.is_superuser:
+        customers = Customer.objects.active()
+    else:
+        customers = Customer.objects.for_agent(agent)
+    customers = customers.only(
+        'id', 'name', 'phone', 'email', 'assigned_agent_id', 'created_at'
+    )
     
     # Apply search if query exists
     if search_query:
@@ -346,16 +477,9 @@ def customer_list(request):
             Q(email__icontains=search_query)
         )
     
-    # Filter by assigned agent if not superuser
-    if not request.user.is_superuser:
-        customers = customers.filter(assigned_agent=agent)
-    
-    # Order by most recent first
-    customers = customers.order_by('-created_at')
-    
     # Pagination
     page = request.GET.get('page', 1)
-    paginator = Paginator(customers, 20)  # Show 20 customers per page
+    paginator = CachedCountPaginator(customers, 20)  # Show 20 customers per page
     
     try:
         customers_page = paginator.page(page)
@@ -376,7 +500,7 @@ def customer_list(request):
 @login_required
 def service_requests_view(request):
     """View for managing service requests from the public website."""
-    agent = get_agent_or_none(request.user)
+    agent = get_agent(request)
     if not agent:
         return render(request, 'sales_hub/agent_profile_required.html')
     
@@ -386,8 +510,11 @@ def service_requests_view(request):
     priority_filter = request.GET.get('priority', '')
     search_query = request.GET.get('q', '')
     
-    # Base queryset
-    service_requests = ServiceRequest.objects.all()
+    # Base queryset, limited to the columns the list renders
+    service_requests = ServiceRequest.objects.only(
+        'id', 'phone_number', 'service_type', 'specific_service',
+        'timeline', 'lead_score', 'status', 'created_at',
+    )
     
     # Apply filters
     if status_filter:
@@ -415,7 +542,7 @@ def service_requests_view(request):
     service_requests = service_requests.order_by('-created_at')
     
     # Pagination
-    paginator = Paginator(service_requests, 20)
+    paginator = CachedCountPaginator(service_requests, 20)
     page = request.GET.get('page')
     
     try:
@@ -426,19 +553,13 @@ def service_requests_view(request):
         service_requests_page = paginator.page(paginator.num_pages)
     
     # Get statistics
-    total_requests = ServiceRequest.objects.count()
-    pending_requests = ServiceRequest.objects.filter(status='pending').count()
-    high_priority_requests = ServiceRequest.objects.filter(
-        lead_score__gte=70,
-        timeline='immediate',
-        status='pending'
-    ).count()
+    stats = ServiceRequest.get_stats()
     
     context = {
         'service_requests': service_requests_page,
-        'total_requests': total_requests,
-        'pending_requests': pending_requests,
-        'high_priority_requests': high_priority_requests,
+        'total_requests': stats['total'],
+        'pending_requests': stats['pending'],
+        'high_priority_requests': stats['high_priority'],
         'status_filter': status_filter,
         'service_type_filter': service_type_filter,
         'priority_filter': priority_filter,
@@ -452,36 +573,39 @@ def service_requests_view(request):
 @login_required
 def service_request_detail(request, pk):
     """Detail view for a single service request with simple actions."""
-    agent = get_agent_or_none(request.user)
+    agent = get_agent(request)
     if not agent:
         return render(request, 'sales_hub/agent_profile_required.html')
     
-    service_request = get_object_or_404(ServiceRequest, pk=pk)
+    service_request = get_object_or_404(
+        ServiceRequest.objects.select_related('assigned_to', 'assigned_to__user'), pk=pk
+    )
     
     if request.method == 'POST':
         new_status = request.POST.get('status')
         assign_to_me = request.POST.get('assign_to_me') == 'on'
         note = request.POST.get('note', '').strip()
         
-        changed = False
+        changed_fields = []
         
-        if new_status and new_status in dict(ServiceRequest.STATUS_CHOICES) and new_status != service_request.status:
+        if new_status and new_status in SERVICE_REQUEST_STATUSES and new_status != service_request.status:
             service_request.status = new_status
-            changed = True
+            changed_fields.append('status')
         
         if assign_to_me and service_request.assigned_to_id != agent.id:
             service_request.assigned_to = agent
-            changed = True
+            changed_fields.append('assigned_to')
         
         if note:
-            timestamp = timezone.now().strftime('%Y-%m-%d %H:%M')
-            prefix = f"[{timestamp}] {agent.user.get_full_name() or agent.user.username}: "
-            existing = service_request.notes or ''
-            service_request.notes = (existing + '\n' if existing else '') + prefix + note
-            changed = True
+            # Same "YYYY-MM-DD HH:MM" stamp as before, without the UTC offset isoformat adds
+            timestamp = timezone.now().replace(tzinfo=None).isoformat(sep=' ', timespec='minutes')
+            note_line = f"[{timestamp}] {agent.user.get_full_name() or agent.user.username}: {note}"
+            existing = service_request.notes
+            service_request.notes = f"{existing}\n{note_line}" if existing else note_line
+            changed_fields.append('notes')
         
-        if changed:
-            service_request.save()
+        if changed_fields:
+            service_request.save(update_fields=[*changed_fields, 'updated_at'])
             messages.success(request, 'Service request updated successfully.')
         else:
             messages.info(request, 'No changes were made.')
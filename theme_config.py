@@ -4,6 +4,8 @@ Theme Configuration for YAS Application
 This module contains theme configurations including colors, styles, and other
 visual elements for the web application.
 """
+import functools
+
 
 class ThemeConfig:
     # Primary Colors
@@ -100,10 +102,14 @@ class ThemeConfig:
     }
     
     @classmethod
+    @functools.cache
     def get_css(cls):
         """
         Generate CSS styles based on the theme configuration.
         
+        The theme is static, so the stylesheet is built once per class and
+        the same string is returned on every later call.
+        
         Returns:
             str: CSS styles that can be included in HTML templates.
         """
@@ -1,10 +1,19 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
+from django.core.cache import cache
+
+from .pagination import USER_COUNT_CACHE_KEY
 
 User = get_user_model()
 
+# Tailwind classes shared by the text and password inputs of the creation form
+_INPUT_CLASS = (
+    'block w-full rounded-lg border-0 py-3 px-4 text-gray-900 shadow-sm ring-1 ring-inset '
+    'ring-gray-300 placeholder:text-gray-400 focus:ring-2 focus:ring-inset '
+    'focus:ring-yas-primary sm:text-sm sm:leading-6 transition duration-150 ease-in-out'
+)
+
 class CustomUserCreationForm(UserCreationForm):
     """A form for creating new users with email as the username and additional fields."""
     email = forms.EmailField(
@@ -12,7 +21,7 @@ class CustomUserCreationForm(UserCreationForm):
         max_length=254,
         widget=forms.EmailInput(attrs={
             'autocomplete': 'email',
-            'class': 'block w-full rounded-lg border-0 py-3 px-4 text-gray-900 shadow-sm ring-1 ring-inset ring-gray-300 placeholder:text-gray-400 focus:ring-2 focus:ring-inset focus:ring-yas-primary sm:text-sm sm:leading-6 transition duration-150 ease-in-out',
+            'class': _INPUT_CLASS,
             'placeholder': 'name@example.com',
             'aria-describedby': 'email-helper-text'
         }),
@@ -23,7 +32,7 @@ class CustomUserCreationForm(UserCreationForm):
         max_length=30,
         required=True,
         widget=forms.TextInput(attrs={
-            'class': 'block w-full rounded-lg border-0 py-3 px-4 text-gray-900 shadow-sm ring-1 ring-inset ring-gray-300 placeholder:text-gray-400 focus:ring-2 focus:ring-inset focus:ring-yas-primary sm:text-sm sm:leading-6 transition duration-150 ease-in-out',
+            'class': _INPUT_CLASS,
             'placeholder': 'John',
             'autocomplete': 'given-name'
         })
@@ -33,7 +42,7 @@ class CustomUserCreationForm(UserCreationForm):
         max_length=30,
         required=True,
         widget=forms.TextInput(attrs={
-            'class': 'block w-full rounded-lg border-0 py-3 px-4 text-gray-900 shadow-sm ring-1 ring-inset ring-gray-300 placeholder:text-gray-400 focus:ring-2 focus:ring-inset focus:ring-yas-primary sm:text-sm sm:leading-6 transition duration-150 ease-in-out',
+            'class': _INPUT_CLASS,
             'placeholder': 'Doe',
             'autocomplete': 'family-name'
         })
@@ -43,7 +52,7 @@ class CustomUserCreationForm(UserCreationForm):
         strip=False,
         widget=forms.PasswordInput(attrs={
             'autocomplete': 'new-password',
-            'class': 'block w-full rounded-lg border-0 py-3 px-4 text-gray-900 shadow-sm ring-1 ring-inset ring-gray-300 placeholder:text-gray-400 focus:ring-2 focus:ring-inset focus:ring-yas-primary sm:text-sm sm:leading-6 transition duration-150 ease-in-out',
+            'class': _INPUT_CLASS,
             'placeholder': '••••••••',
             'aria-describedby': 'password-requirements'
         }),
@@ -60,7 +69,7 @@ class CustomUserCreationForm(UserCreationForm):
         label='Confirm Password',
         widget=forms.PasswordInput(attrs={
             'autocomplete': 'new-password',
-            'class': 'block w-full rounded-lg border-0 py-3 px-4 text-gray-900 shadow-sm ring-1 ring-inset ring-gray-300 placeholder:text-gray-400 focus:ring-2 focus:ring-inset focus:ring-yas-primary sm:text-sm sm:leading-6 transition duration-150 ease-in-out',
+            'class': _INPUT_CLASS,
             'placeholder': '••••••••',
             'aria-describedby': 'password-confirm-helper'
         }),
@@ -81,18 +90,16 @@ class CustomUserCreationForm(UserCreationForm):
         model = User
         fields = ('email', 'first_name', 'last_name', 'is_superuser')
 
-    def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
-            raise ValidationError("A user with that email already exists.")
-        return email
-
     def save(self, commit=True):
         user = super().save(commit=False)
+        # The username keeps the email as typed, since ModelBackend matches it
+        # exactly at login; only the stored email is normalized
         user.username = self.cleaned_data['email']  # Use email as username
+        user.email = user.email.lower()
         user.is_active = True
         if commit:
             user.save()
+            cache.delete(USER_COUNT_CACHE_KEY)
         return user
 
 class CustomUserChangeForm(UserChangeForm):
@@ -108,7 +115,5 @@ class CustomUserChangeForm(UserChangeForm):
         fields = ('email', 'first_name', 'last_name', 'is_active', 'is_superuser')
 
     def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exclude(pk=self.instance.pk).exists():
-            raise ValidationError("A user with that email already exists.")
-        return email
+        # Uniqueness is enforced by the LOWER(email) index; see UserUpdateView.form_valid
+        return self.cleaned_data.get('email').lower()
@@ -0,0 +1,53 @@
+# Case-insensitive unique index on auth_user.email.
+#
+# auth.User is not swappable here, so the constraint cannot live on a model
+# Meta; it is created directly. Blank emails are excluded so users created
+# without one (e.g. via createsuperuser) do not collide. Existing accounts
+# whose emails differ only by case must be merged by hand first; the check
+# below lists them instead of letting CREATE INDEX fail mid-deploy.
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_email_collisions(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    duplicates = (
+        User.objects.exclude(email='')
+        .annotate(email_ci=Lower('email'))
+        .values('email_ci')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('email_ci', flat=True)
+    )
+    collisions = []
+    for email in duplicates:
+        users = User.objects.filter(email__iexact=email).order_by('id')
+        collisions.append('  %s: %s' % (email, ', '.join(
+            'id=%s (%s)' % (user.pk, user.email) for user in users
+        )))
+    if collisions:
+        raise RuntimeError(
+            'Cannot add the case-insensitive unique index on auth_user.email; '
+            'these users share an email ignoring case. Change or merge them '
+            'and re-run migrate:\n' + '\n'.join(collisions)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_email_collisions, migrations.RunPython.noop),
+        migrations.RunSQL(
+            sql=(
+                'CREATE UNIQUE INDEX IF NOT EXISTS users_user_email_ci_uniq '
+                "ON auth_user (LOWER(email)) WHERE email <> ''"
+            ),
+            reverse_sql='DROP INDEX IF EXISTS users_user_email_ci_uniq',
+        ),
+    ]
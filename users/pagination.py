@@ -0,0 +1,16 @@
+from sales_hub.pagination import CachedCountPaginator
+
+USER_COUNT_CACHE_KEY = 'users:count'
+
+
+class UserCountPaginator(CachedCountPaginator):
+    """
+    Paginator for the user list that caches the total user count.
+
+    The user list is never filtered, so a single fixed key is used and
+    ``CustomUserCreationForm.save`` can drop it when a user is added.
+    """
+    count_cache_timeout = 60
+
+    def get_count_cache_key(self):
+        return USER_COUNT_CACHE_KEY
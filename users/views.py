@@ -2,12 +2,21 @@ from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.messages.views import SuccessMessageMixin
+from django.db import IntegrityError, transaction
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView
 from .forms import CustomUserCreationForm, CustomUserChangeForm
+from .pagination import UserCountPaginator
 
 User = get_user_model()
 
+
+def user_list_queryset():
+    """Users in signup order, limited to the columns the user list renders."""
+    return User.objects.only(
+        'id', 'email', 'first_name', 'last_name', 'is_active', 'is_superuser', 'date_joined'
+    ).order_by('date_joined')
+
 class SuperuserRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
     """Verify that the current user is a superuser."""
     def test_func(self):
@@ -19,9 +28,10 @@ class UserListView(SuperuserRequiredMixin, ListView):
     template_name = 'sales_hub/users/list.html'
     context_object_name = 'users'
     paginate_by = 10
+    paginator_class = UserCountPaginator
     
     def get_queryset(self):
-        return User.objects.all().order_by('date_joined')
+        return user_list_queryset()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -38,14 +48,20 @@ class UserCreateView(SuperuserRequiredMixin, SuccessMessageMixin, CreateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['users'] = User.objects.all().order_by('date_joined')
+        context['users'] = user_list_queryset()
         context['active_tab'] = 'user_management'
         context['show_add_user_modal'] = True
         return context
     
     def form_valid(self, form):
-            # The form's save method already handles saving the user
-        return super().form_valid(form)
+        # Email uniqueness is enforced by the database (users_user_email_ci_uniq)
+        # so concurrent signups cannot both succeed.
+        try:
+            with transaction.atomic():
+                return super().form_valid(form)
+        except IntegrityError:
+            form.add_error('email', "A user with that email already exists.")
+            return self.form_invalid(form)
 
 class UserUpdateView(SuperuserRequiredMixin, SuccessMessageMixin, UpdateView):
     """View for updating a user."""
@@ -59,3 +75,12 @@ class UserUpdateView(SuperuserRequiredMixin, SuccessMessageMixin, UpdateView):
         context = super().get_context_data(**kwargs)
         context['active_tab'] = 'user_management'
         return context
+    
+    def form_valid(self, form):
+        # A duplicate email is rejected by the unique index on LOWER(email)
+        try:
+            with transaction.atomic():
+                return super().form_valid(form)
+        except IntegrityError:
+            form.add_error('email', "A user with that email already exists.")
+            return self.form_invalid(form)
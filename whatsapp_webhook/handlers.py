@@ -0,0 +1,263 @@
+"""
+Processing of WhatsApp webhook events.
+
+Kept apart from the views so the background task can import it without the
+view layer.
+"""
+from django.conf import settings
+import json
+import hmac
+import logging
+import time
+
+# Output is configured by the whatsapp_webhook logger in settings.LOGGING
+logger = logging.getLogger(__name__)
+
+# Get WhatsApp credentials from settings
+WHATSAPP_APP_SECRET = getattr(settings, 'WHATSAPP_APP_SECRET', '')
+WHATSAPP_APP_SECRET_BYTES = WHATSAPP_APP_SECRET.encode('utf-8')
+
+# Global message storage
+webhook_messages = []
+
+# Store messages in memory (for demo purposes - in production, use a database)
+MAX_STORED_MESSAGES = 50
+
+def store_message(payload):
+    """
+    Store an incoming webhook body in memory for view_webhook_messages
+    
+    Args:
+        payload (bytes): Raw request body, already signature-checked
+    """
+    try:
+        data = json.loads(payload)
+    except json.JSONDecodeError:
+        data = payload.decode('utf-8', errors='replace')
+    webhook_messages.append({
+        'timestamp': time.time(),
+        'data': data
+    })
+    # Keep only the most recent messages
+    del webhook_messages[:-MAX_STORED_MESSAGES]
+
+def verify_signature(payload, signature):
+    """
+    Verify the signature of the webhook request
+    
+    Args:
+        payload: Raw request body (bytes)
+        signature: X-Hub-Signature-256 header value
+        
+    Returns:
+        bool: True if signature is valid, False otherwise
+    """
+    if not WHATSAPP_APP_SECRET:
+        logger.warning("No app secret set, skipping signature verification")
+        return True  # Skip verification if no secret is set
+    
+    if not signature:
+        logger.error("No signature provided in request")
+        return False
+    
+    # Decode the header once; anything but a 32-byte SHA-256 digest is rejected
+    # before hashing the payload
+    try:
+        provided_signature = bytes.fromhex(signature.removeprefix('sha256='))
+    except ValueError:
+        provided_signature = b''
+    if len(provided_signature) != 32:
+        logger.warning("Malformed webhook signature header")
+        return False
+    
+    # One-shot HMAC of the payload, compared as raw bytes in constant time
+    expected_signature = hmac.digest(WHATSAPP_APP_SECRET_BYTES, payload, 'sha256')
+    is_valid = hmac.compare_digest(expected_signature, provided_signature)
+    
+    if not is_valid:
+        # Never log the expected signature
+        logger.warning("Webhook signature does not match the payload")
+        
+    return is_valid
+
+def process_whatsapp_event(data):
+    """
+    Process incoming WhatsApp webhook events
+    
+    Args:
+        data (dict): Parsed JSON data from the webhook
+    """
+    try:
+        logger.info("Processing WhatsApp webhook event")
+        
+        # Check if this is a test webhook
+        if data.get('object') != 'whatsapp_business_account':
+            logger.warning("Unexpected webhook object type: %s", data.get('object'))
+            return
+        
+        # Process each entry in the webhook
+        for entry in data.get('entry', []):
+            entry_id = entry.get('id', 'unknown')
+            logger.debug("Processing entry %s", entry_id)
+            
+            for change in entry.get('changes', []):
+                try:
+                    process_change(change)
+                except Exception:
+                    logger.exception("Error processing webhook change")
+                    
+    except Exception as e:
+        logger.exception("Error processing WhatsApp event")
+
+def process_change(change):
+    """
+    Process a single change from a webhook entry
+    
+    Args:
+        change (dict): One item of an entry's 'changes' list
+    """
+    value = change.get('value', {})
+    field = change.get('field')
+    
+    logger.info("Processing change in field: %s", field)
+    
+    # Handle message events
+    if 'messages' in value:
+        phone_number_id = value.get('metadata', {}).get('phone_number_id', 'unknown')
+        logger.info("Processing %d messages for phone number ID: %s", len(value['messages']), phone_number_id)
+        
+        for message in value['messages']:
+            message_id = message.get('id', 'unknown')
+            logger.debug("Processing message %s", message_id)
+            handle_message(message, phone_number_id)
+    
+    # Handle status updates
+    elif 'statuses' in value:
+        logger.info("Processing %d status updates", len(value['statuses']))
+        for status in value['statuses']:
+            handle_status_update(status)
+    
+    else:
+        logger.info("Unhandled webhook change type in field: %s", field)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Change data: %s", json.dumps(change, indent=2))
+
+def _handle_text_message(message, phone_number_id):
+    text = message.get('text', {}).get('body', '')
+    logger.info("Text message content: %.100s", text)
+    
+    # TODO: Add your message processing logic here
+    # Example: process_text_message(from_number, text, phone_number_id)
+
+def _handle_image_message(message, phone_number_id):
+    image = message.get('image', {})
+    image_id = image.get('id')
+    mime_type = image.get('mime_type', 'image/jpeg')
+    logger.info("Received %s image (ID: %s)", mime_type, image_id)
+    
+    # TODO: Handle image message
+    # Example: process_image_message(from_number, image_id, mime_type, phone_number_id)
+
+def _handle_document_message(message, phone_number_id):
+    document = message.get('document', {})
+    filename = document.get('filename', 'document')
+    mime_type = document.get('mime_type', 'application/octet-stream')
+    logger.info("Received document: %s (%s)", filename, mime_type)
+
+def _handle_unknown_message(message, phone_number_id):
+    logger.info("Unhandled message type: %s", message.get('type'))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Message data: %s", json.dumps(message, indent=2))
+
+# Message handlers by WhatsApp message type; register new types here
+MESSAGE_HANDLERS = {
+    'text': _handle_text_message,
+    'image': _handle_image_message,
+    'document': _handle_document_message,
+}
+
+def handle_message(message, phone_number_id):
+    """
+    Handle incoming WhatsApp messages
+    
+    Args:
+        message (dict): The message data from WhatsApp
+        phone_number_id (str): The phone number ID that received the message
+    """
+    try:
+        # Extract message details
+        message_type = message.get('type')
+        from_number = message.get('from', 'unknown')
+        message_id = message.get('id', 'unknown')
+        timestamp = message.get('timestamp', 0)
+        
+        logger.info(
+            "New %s message from %s (ID: %s, Timestamp: %s)",
+            message_type, from_number, message_id, timestamp
+        )
+        
+        # Handle different message types
+        handler = MESSAGE_HANDLERS.get(message_type, _handle_unknown_message)
+        handler(message, phone_number_id)
+            
+    except Exception as e:
+        logger.exception("Error processing %s message", message_type)
+
+def _handle_sent_status(status, message_id):
+    # Message was sent from WhatsApp
+    logger.debug("Message %s was sent to WhatsApp", message_id)
+
+def _handle_delivered_status(status, message_id):
+    # Message was delivered to the recipient's device
+    logger.debug("Message %s was delivered to the recipient", message_id)
+
+def _handle_read_status(status, message_id):
+    # Message was read by the recipient
+    logger.debug("Message %s was read by the recipient", message_id)
+
+def _handle_failed_status(status, message_id):
+    # Message delivery failed
+    error = status.get('errors', [{}])[0]
+    error_code = error.get('code')
+    error_title = error.get('title', 'Unknown error')
+    logger.error(
+        "Message %s failed to send. Error %s: %s",
+        message_id, error_code, error_title
+    )
+
+# Status handlers by WhatsApp delivery status; other statuses are only logged
+STATUS_HANDLERS = {
+    'sent': _handle_sent_status,
+    'delivered': _handle_delivered_status,
+    'read': _handle_read_status,
+    'failed': _handle_failed_status,
+}
+
+def handle_status_update(status):
+    """
+    Handle message status updates
+    
+    Args:
+        status (dict): Status update data from WhatsApp
+    """
+    try:
+        message_id = status.get('id', 'unknown')
+        status_type = status.get('status')
+        recipient_id = status.get('recipient_id')
+        timestamp = status.get('timestamp', 0)
+        
+        logger.info(
+            "Status update - Message ID: %s, Status: %s, Recipient: %s, Timestamp: %s",
+            message_id, status_type, recipient_id, timestamp
+        )
+        
+        # Handle different status types
+        handler = STATUS_HANDLERS.get(status_type)
+        if handler:
+            handler(status, message_id)
+        
+        # TODO: Update message status in your database
+        # Example: update_message_status(message_id, status_type, timestamp)
+        
+    except Exception as e:
+        logger.exception("Error processing status update")
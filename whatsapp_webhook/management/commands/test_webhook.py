@@ -2,6 +2,23 @@ from django.core.management.base import BaseCommand
 from django.conf import settings
 import requests
 import json
+import string
+
+# Example request for sending a text message, filled in by the command
+CURL_COMMAND_TEMPLATE = string.Template("""
+        curl -X POST \
+        'https://graph.facebook.com/v18.0/$phone_number_id/messages' \
+        -H 'Authorization: Bearer $access_token' \
+        -H 'Content-Type: application/json' \
+        -d '{
+            "messaging_product": "whatsapp",
+            "to": "$test_phone",
+            "type": "text",
+            "text": {
+                "body": "$test_message"
+            }
+        }'
+        """)
 
 class Command(BaseCommand):
     help = 'Test the WhatsApp webhook configuration'
@@ -44,20 +61,12 @@ class Command(BaseCommand):
         test_phone = '255712345678'  # Replace with test number
         test_message = 'Hello from Bluerock POS!'
         
-        curl_command = f"""
-        curl -X POST \
-        'https://graph.facebook.com/v18.0/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages' \
-        -H 'Authorization: Bearer {settings.WHATSAPP_ACCESS_TOKEN}' \
-        -H 'Content-Type: application/json' \
-        -d '{{
-            "messaging_product": "whatsapp",
-            "to": "{test_phone}",
-            "type": "text",
-            "text": {{
-                "body": "{test_message}"
-            }}
-        }}'
-        """
+        curl_command = CURL_COMMAND_TEMPLATE.safe_substitute(
+            phone_number_id=settings.WHATSAPP_PHONE_NUMBER_ID,
+            access_token=settings.WHATSAPP_ACCESS_TOKEN,
+            test_phone=test_phone,
+            test_message=test_message,
+        )
         
         self.stdout.write(self.style.SUCCESS('Curl command to test sending a message:'))
         self.stdout.write(curl_command)
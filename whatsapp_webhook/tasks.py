@@ -0,0 +1,25 @@
+import json
+import logging
+
+from .handlers import process_whatsapp_event
+
+logger = logging.getLogger(__name__)
+
+
+def process_webhook_payload(payload):
+    """
+    Parse a raw webhook body and process the WhatsApp event it carries.
+
+    Runs on a django-rq worker when Redis is configured, so parsing and
+    dispatch stay off the webhook request.
+
+    Args:
+        payload (bytes): Raw request body, already signature-checked
+    """
+    try:
+        data = json.loads(payload)
+    except json.JSONDecodeError as e:
+        logger.error("Failed to parse webhook JSON: %s", e)
+        return
+
+    process_whatsapp_event(data)
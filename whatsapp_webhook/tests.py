@@ -1,3 +1,60 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from .handlers import WHATSAPP_APP_SECRET_BYTES, webhook_messages
+from .tasks import process_webhook_payload
+from .whatsapp_api import _normalize_msisdn
+
+
+class NormalizeMsisdnTests(SimpleTestCase):
+    def test_local_numbers_get_country_code(self):
+        self.assertEqual(_normalize_msisdn('0712345678'), '255712345678')
+        self.assertEqual(_normalize_msisdn('712345678'), '255712345678')
+
+    def test_separators_are_dropped(self):
+        self.assertEqual(_normalize_msisdn('0712 345 678'), '255712345678')
+        self.assertEqual(_normalize_msisdn('0712-345-678'), '255712345678')
+        self.assertEqual(_normalize_msisdn('+255 712 345 678'), '255712345678')
+
+    def test_tanzanian_numbers_are_kept(self):
+        self.assertEqual(_normalize_msisdn('255712345678'), '255712345678')
+        self.assertEqual(_normalize_msisdn('+255712345678'), '255712345678')
+
+    def test_other_country_codes_are_unchanged(self):
+        self.assertEqual(_normalize_msisdn('+44 20 7946 0958'), '+44 20 7946 0958')
+
+
+class ProcessWebhookPayloadTests(SimpleTestCase):
+    def test_malformed_change_does_not_drop_the_rest(self):
+        body = json.dumps({'object': 'whatsapp_business_account', 'entry': [{'id': '1', 'changes': [
+            {'field': 'messages', 'value': {'statuses': None}},
+            {'field': 'messages', 'value': {'statuses': [{'id': 'm1', 'status': 'read'}]}},
+        ]}]}).encode()
+        with self.assertLogs('whatsapp_webhook', 'INFO') as logs:
+            process_webhook_payload(body)
+        self.assertTrue(any('Error processing webhook change' in line for line in logs.output))
+        self.assertTrue(any('Message ID: m1' in line for line in logs.output))
+
+
+@override_settings(DEBUG=True)
+class WebhookMessageStoreTests(SimpleTestCase):
+    def setUp(self):
+        webhook_messages.clear()
+
+    def post_signed(self, body):
+        signature = hmac.new(WHATSAPP_APP_SECRET_BYTES, body, hashlib.sha256).hexdigest()
+        return self.client.post(reverse('webhook'), body, content_type='application/json',
+                                HTTP_X_HUB_SIGNATURE_256=f'sha256={signature}')
+
+    def test_large_bodies_are_stored_by_the_web_process(self):
+        statuses = [{'id': f'm{i}', 'status': 'read'} for i in range(500)]
+        body = json.dumps({'object': 'whatsapp_business_account', 'entry': [
+            {'id': '1', 'changes': [{'field': 'messages', 'value': {'statuses': statuses}}]},
+        ]}).encode()
+        self.assertEqual(self.post_signed(body).status_code, 200)
+        response = self.client.get(reverse('webhook_messages'))
+        self.assertEqual(response.json()['count'], 1)
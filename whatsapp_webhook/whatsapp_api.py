@@ -1,6 +1,50 @@
+import re
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# One pooled session for all Graph API calls, so the TCP/TLS connection to
+# graph.facebook.com is reused across sends instead of reopened per message.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=50))
+
+_URL = f"https://graph.facebook.com/v18.0/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
+
+_HEADERS = {
+    'Authorization': f'Bearer {settings.WHATSAPP_ACCESS_TOKEN}',
+    'Content-Type': 'application/json'
+}
+
+
+def _dumps(payload):
+    """
+    Encode a request body as compact JSON (_HEADERS already sets the content type)
+    
+    Same encoding as requests' json= apart from the separators, which drop
+    the whitespace after ',' and ':'.
+    """
+    return json.dumps(payload, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+# Optional 255 country code, leading zeros, then the subscriber digits
+_MSISDN_RE = re.compile(r'^(?:255)?0*(\d+)$')
+_NON_DIGIT_RE = re.compile(r'\D')
+
+def _normalize_msisdn(phone_number):
+    """
+    Format a phone number as the API expects (e.g. '0712 345 678' -> '255712345678')
+    
+    Spaces, dashes and other separators are dropped. Numbers without a country
+    code are assumed to be Tanzanian. Numbers with another '+' country code
+    are returned unchanged.
+    """
+    digits = _NON_DIGIT_RE.sub('', phone_number)
+    if phone_number.lstrip().startswith('+') and not digits.startswith('255'):
+        return phone_number
+    match = _MSISDN_RE.match(digits)
+    return f'255{match.group(1)}' if match else phone_number
 
 def send_whatsapp_message(phone_number, message, message_type='text', **kwargs):
     """
@@ -15,18 +59,7 @@ def send_whatsapp_message(phone_number, message, message_type='text', **kwargs):
     Returns:
         dict: API response
     """
-    url = f"https://graph.facebook.com/v18.0/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
-    
-    headers = {
-        'Authorization': f'Bearer {settings.WHATSAPP_ACCESS_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-    
-    # Format phone number if needed (ensure it's in the correct format)
-    if not phone_number.startswith('+'):
-        # Assuming Tanzanian numbers by default if no country code is provided
-        if not phone_number.startswith('255'):
-            phone_number = f'255{phone_number.lstrip('0')}'
+    phone_number = _normalize_msisdn(phone_number)
     
     recipient = {
         'messaging_product': 'whatsapp',
@@ -63,7 +96,7 @@ def send_whatsapp_message(phone_number, message, message_type='text', **kwargs):
         raise ValueError(f"Unsupported message type: {message_type}")
     
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        response = _SESSION.post(_URL, headers=_HEADERS, data=_dumps(payload))
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -85,17 +118,7 @@ def send_template_message(phone_number, template_name, language_code='en', compo
     Returns:
         dict: API response
     """
-    url = f"https://graph.facebook.com/v18.0/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
-    
-    headers = {
-        'Authorization': f'Bearer {settings.WHATSAPP_ACCESS_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-    
-    # Format phone number if needed
-    if not phone_number.startswith('+'):
-        if not phone_number.startswith('255'):
-            phone_number = f'255{phone_number.lstrip('0')}'
+    phone_number = _normalize_msisdn(phone_number)
     
     payload = {
         'messaging_product': 'whatsapp',
@@ -113,7 +136,7 @@ def send_template_message(phone_number, template_name, language_code='en', compo
         payload['template']['components'] = components
     
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        response = _SESSION.post(_URL, headers=_HEADERS, data=_dumps(payload))
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -121,3 +144,26 @@ def send_template_message(phone_number, template_name, language_code='en', compo
         if hasattr(e, 'response') and e.response is not None:
             print(f"Response content: {e.response.text}")
         raise
+
+def send_bulk(messages, max_workers=10):
+    """
+    Send several WhatsApp messages concurrently over the shared session
+    
+    Args:
+        messages (iterable): Keyword-argument dicts for send_whatsapp_message,
+            e.g. {'phone_number': '0712345678', 'message': 'Hello'}
+        max_workers (int): Number of sends in flight at once (at most the
+            session's pool size)
+    
+    Returns:
+        list: One entry per message, in order: the API response, or the
+            exception raised for that message
+    """
+    def send(kwargs):
+        try:
+            return send_whatsapp_message(**kwargs)
+        except Exception as e:
+            return e
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(send, messages))